@@ -1,15 +1,17 @@
 ﻿import pandas as pd
 import numpy as np
-from collections import defaultdict
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 
 def preprocess_data(file_path, year):
     encodings = ['utf-8-sig', 'utf-8', 'gb2312']
+    read_fields = {'ReporterName', 'PartnerName', 'NetWeight', 'netWgt'}
     df = None
     for encoding in encodings:
         try:
-            df = pd.read_csv(file_path, encoding=encoding)
+            df = pd.read_csv(file_path, encoding=encoding,
+                             usecols=lambda col: col.strip() in read_fields)
             print(f"{year} data read successfully! Encoding: {encoding}")
             break
         except UnicodeDecodeError:
@@ -17,7 +19,7 @@ def preprocess_data(file_path, year):
     if df is None:
         raise ValueError(f"All common encodings failed for {year}. Check file format.")
 
-    print(f"{year} original columns:", df.columns.tolist())
+    print(f"{year} loaded columns:", df.columns.tolist())
     print(f"{year} original rows:", len(df))
 
     if 'netWgt' in df.columns:
@@ -34,36 +36,37 @@ def preprocess_data(file_path, year):
     df_core['ReporterName'] = df_core['ReporterName'].str.strip()
     df_core['PartnerName'] = df_core['PartnerName'].str.strip()
 
-    def sort_country_pair(imp_country, exp_country):
-        return tuple(sorted([imp_country, exp_country]))
+    reporters = df_core['ReporterName'].to_numpy()
+    partners = df_core['PartnerName'].to_numpy()
+    reporter_first = reporters <= partners
+    df_core['c1'] = np.where(reporter_first, reporters, partners)
+    df_core['c2'] = np.where(reporter_first, partners, reporters)
+    valid_record_count = len(df_core)
 
-    df_core['sorted_country_pair'] = df_core.apply(
-        lambda x: sort_country_pair(x['ReporterName'], x['PartnerName']), axis=1
-    )
+    df_core = df_core.groupby(
+        ['ReporterName', 'PartnerName', 'c1', 'c2'], sort=False, as_index=False
+    )['NetWeight'].sum()
 
     print(f"{year} preprocessing done!")
-    print(f"{year} valid trade records:", len(df_core))
+    print(f"{year} valid trade records:", valid_record_count)
+    print(f"{year} trade flows after merging duplicate records:", len(df_core))
     print(f"{year} unique countries:", len(set(df_core['ReporterName']) | set(df_core['PartnerName'])))
     return df_core
 
 
 def calculate_trade_intensity(df_core, year):
-    country_total_intensity = defaultdict(float)
-    for _, row in df_core.iterrows():
-        imp_country = row['ReporterName']
-        exp_country = row['PartnerName']
-        trade_volume = row['NetWeight']
-        country_total_intensity[imp_country] += trade_volume
-        country_total_intensity[exp_country] += trade_volume
-
-    pair_co_intensity = defaultdict(float)
-    for _, row in df_core.iterrows():
-        sorted_pair = row['sorted_country_pair']
-        trade_volume = row['NetWeight']
-        pair_co_intensity[sorted_pair] += trade_volume
-
-    total_all_country_intensity = sum(country_total_intensity.values())
-    total_all_pair_intensity = sum(pair_co_intensity.values())
+    country_volumes = pd.concat([
+        df_core[['ReporterName', 'NetWeight']].rename(columns={'ReporterName': 'Country'}),
+        df_core[['PartnerName', 'NetWeight']].rename(columns={'PartnerName': 'Country'})
+    ])
+    country_total = country_volumes.groupby('Country', sort=False)['NetWeight'].sum()
+    pair_total = df_core.groupby(['c1', 'c2'], sort=False)['NetWeight'].sum()
+
+    country_total_intensity = country_total.to_dict()
+    pair_co_intensity = pair_total.to_dict()
+
+    total_all_country_intensity = country_total.sum()
+    total_all_pair_intensity = pair_total.sum()
 
     print(f"{year} trade intensity calculated.")
     print(f"{year} total country intensity:", round(total_all_country_intensity, 2))
@@ -74,76 +77,106 @@ def calculate_trade_intensity(df_core, year):
 def calculate_pmi_and_valid_edges(df_core, country_total_intensity, pair_co_intensity,
                                   total_all_country_intensity, total_all_pair_intensity, year):
     all_countries = sorted(list(country_total_intensity.keys()))
-    pmi_matrix = pd.DataFrame(
-        index=all_countries,
-        columns=all_countries,
-        dtype=float
-    ).fillna(0.0)
-
-    for exp_country in all_countries:
-        for imp_country in all_countries:
-            if exp_country == imp_country:
-                pmi_matrix.loc[exp_country, imp_country] = 0.0
-                continue
-
-            sorted_pair = tuple(sorted([imp_country, exp_country]))
-            co_intensity = pair_co_intensity.get(sorted_pair, 0.0)
-
-            p_xy = co_intensity / total_all_pair_intensity if total_all_pair_intensity != 0 else 0.0
-            p_exp = country_total_intensity[exp_country] / total_all_country_intensity if total_all_country_intensity != 0 else 0.0
-            p_imp = country_total_intensity[imp_country] / total_all_country_intensity if total_all_country_intensity != 0 else 0.0
-
-            if p_xy == 0 or p_exp * p_imp == 0:
-                pmi_value = 0.0
-            else:
-                pmi_value = np.log2(p_xy / (p_exp * p_imp))
-            pmi_matrix.loc[exp_country, imp_country] = pmi_value
-
-    all_pmi_values = pmi_matrix.values.flatten()
+    country_count = len(all_countries)
+    country_to_idx = {country: idx for idx, country in enumerate(all_countries)}
+
+    co_intensity = np.zeros((country_count, country_count))
+    for (country_a, country_b), intensity in pair_co_intensity.items():
+        idx_a, idx_b = country_to_idx[country_a], country_to_idx[country_b]
+        co_intensity[idx_a, idx_b] = intensity
+        co_intensity[idx_b, idx_a] = intensity
+    country_intensity = np.array([country_total_intensity[c] for c in all_countries])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p_xy = co_intensity / total_all_pair_intensity
+        p_marginal = country_intensity / total_all_country_intensity
+        p_exp_imp = np.outer(p_marginal, p_marginal)
+        pmi = np.where((p_xy > 0) & (p_exp_imp > 0), np.log2(p_xy / p_exp_imp), 0.0)
+    np.fill_diagonal(pmi, 0.0)
+
+    pmi_pair_idx = np.argwhere(np.triu(pmi, k=1) != 0)
+    country_names = np.array(all_countries, dtype=object)
+    pmi_pairs = pd.DataFrame({
+        'c1': country_names[pmi_pair_idx[:, 0]],
+        'c2': country_names[pmi_pair_idx[:, 1]],
+        'raw_pmi': pmi[pmi_pair_idx[:, 0], pmi_pair_idx[:, 1]]
+    })
+
+    all_pmi_values = pmi.flatten()
     min_pmi = all_pmi_values.min()
     max_pmi = all_pmi_values.max()
     print(f"{year} PMI calculated. Range: Min={min_pmi:.4f}, Max={max_pmi:.4f}")
 
-    valid_edge_list = []
-    for _, row in df_core.iterrows():
-        source_exp = row['PartnerName']
-        target_imp = row['ReporterName']
-        trade_volume = row['NetWeight']
-        pmi_value = pmi_matrix.loc[source_exp, target_imp]
-
-        if max_pmi == min_pmi:
-            wij_value = 0.0
-        else:
-            wij_value = (pmi_value - min_pmi) / (max_pmi - min_pmi)
-        wij_value = round(wij_value, 4)
-
-        valid_edge_list.append({
-            'source': source_exp,
-            'target': target_imp,
-            'weight': wij_value,
-            'raw_pmi': round(pmi_value, 4),
-            'trade_volume': trade_volume
-        })
-
-    valid_edge_df = pd.DataFrame(valid_edge_list).drop_duplicates(
-        subset=['source', 'target']
-    )
+    source_idx = df_core['PartnerName'].map(country_to_idx).to_numpy()
+    target_idx = df_core['ReporterName'].map(country_to_idx).to_numpy()
+    pmi_values = pmi[source_idx, target_idx]
+
+    if max_pmi == min_pmi:
+        wij_values = np.zeros_like(pmi_values)
+    else:
+        wij_values = (pmi_values - min_pmi) / (max_pmi - min_pmi)
+
+    valid_edge_df = pd.DataFrame({
+        'source': df_core['PartnerName'].to_numpy(),
+        'target': df_core['ReporterName'].to_numpy(),
+        'weight': np.round(wij_values, 4),
+        'raw_pmi': np.round(pmi_values, 4),
+        'trade_volume': df_core['NetWeight'].to_numpy()
+    })
+
+    adj_matrix = np.zeros((country_count, country_count), dtype=np.float32)
+    adj_matrix[source_idx, target_idx] = valid_edge_df['weight'].to_numpy()
+    adj_matrix_df = pd.DataFrame(adj_matrix, index=all_countries, columns=all_countries)
 
     print(f"{year} valid edge table generated.")
-    print(f"{year} valid edges (deduplicated):", len(valid_edge_df))
-    return pmi_matrix, valid_edge_df
+    print(f"{year} valid edges:", len(valid_edge_df))
+    return pmi_pairs, valid_edge_df, adj_matrix_df
 
 
-def export_results(pmi_matrix, valid_edge_df, output_dir, year):
-    pmi_matrix_path = os.path.join(output_dir, f"{year}_Raw_PMI_Matrix.csv")
+def export_results(pmi_pairs, valid_edge_df, adj_matrix_df, output_dir, year):
+    pmi_pairs_path = os.path.join(output_dir, f"{year}_Raw_PMI_Pairs.csv")
     valid_edge_path = os.path.join(output_dir, f"{year}_Wij_Valid_Trade_Edges.csv")
+    valid_edge_parquet_path = os.path.join(output_dir, f"{year}_Wij_Valid_Trade_Edges.parquet")
+    adj_matrix_path = os.path.join(output_dir, f"Trade_Weighted_Adjacency_Matrix_{year}.csv")
+    adj_matrix_parquet_path = os.path.join(output_dir, f"Trade_Weighted_Adjacency_Matrix_{year}.parquet")
 
-    pmi_matrix.to_csv(pmi_matrix_path, encoding='utf-8-sig', index=True)
+    pmi_pairs.to_csv(pmi_pairs_path, encoding='utf-8-sig', index=False)
     valid_edge_df.to_csv(valid_edge_path, encoding='utf-8-sig', index=False)
+    valid_edge_df.to_parquet(valid_edge_parquet_path, compression='zstd', index=False)
+    adj_matrix_df.to_csv(adj_matrix_path, encoding='utf-8', index=True)
+    adj_matrix_df.to_parquet(adj_matrix_parquet_path, compression='zstd', index=True)
 
     print(f"{year} results exported to: {output_dir}")
-    print(f"  - PMI matrix: {os.path.basename(pmi_matrix_path)}")
+    print(f"  - PMI country pairs (nonzero, c1 < c2): {os.path.basename(pmi_pairs_path)}")
     print(f"  - Gephi edge table: {os.path.basename(valid_edge_path)}")
+    print(f"  - Edge table for the adjacency step: {os.path.basename(valid_edge_parquet_path)}")
+    print(f"  - Ucinet adjacency matrix: {os.path.basename(adj_matrix_path)}")
+
+
+def process_year(year, file_path):
+    print("=" * 60)
+    print(f"Processing {year} trade data")
+    print("=" * 60)
+
+    df_valid_trade = preprocess_data(file_path, year)
+
+    country_intensity, pair_intensity, total_country_intensity, total_pair_intensity = calculate_trade_intensity(df_valid_trade, year)
+
+    pmi_pairs, valid_edge_df, adj_matrix_df = calculate_pmi_and_valid_edges(
+        df_valid_trade,
+        country_intensity,
+        pair_intensity,
+        total_country_intensity,
+        total_pair_intensity,
+        year
+    )
+
+    output_dir = os.path.dirname(file_path)
+    export_results(pmi_pairs, valid_edge_df, adj_matrix_df, output_dir, year)
+
+    print(f"{year} edge table preview (first 3):")
+    print(valid_edge_df[['source', 'target', 'weight', 'trade_volume']].head(3))
+    print(f"{year} processing complete.\n")
 
 
 def main():
@@ -161,30 +194,10 @@ def main():
         (2023, "your_file_location/2023_data.csv")
     ]
 
-    for year, file_path in data_config:
-        print("=" * 60)
-        print(f"Processing {year} trade data")
-        print("=" * 60)
-
-        df_valid_trade = preprocess_data(file_path, year)
-
-        country_intensity, pair_intensity, total_country_intensity, total_pair_intensity = calculate_trade_intensity(df_valid_trade, year)
-
-        pmi_matrix, valid_edge_df = calculate_pmi_and_valid_edges(
-            df_valid_trade,
-            country_intensity,
-            pair_intensity,
-            total_country_intensity,
-            total_pair_intensity,
-            year
-        )
-
-        output_dir = os.path.dirname(file_path)
-        export_results(pmi_matrix, valid_edge_df, output_dir, year)
-
-        print(f"{year} edge table preview (first 3):")
-        print(valid_edge_df[['source', 'target', 'weight', 'trade_volume']].head(3))
-        print(f"{year} processing complete.\n")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [executor.submit(process_year, year, file_path) for year, file_path in data_config]
+        for future in futures:
+            future.result()
 
     print("=" * 60)
     print("2013-2023 batch processing finished!")
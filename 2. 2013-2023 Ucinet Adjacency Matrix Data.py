@@ -1,12 +1,31 @@
 ﻿import pandas as pd
 import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def read_edge_table(input_path):
+    """
+    Read an edge table, preferring the Parquet copy written next to the CSV
+
+    The Parquet file is only used when it is at least as new as the CSV, so
+    a CSV edited and re-saved afterwards still takes precedence.
+    """
+    parquet_path = os.path.splitext(input_path)[0] + '.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(input_path):
+        return pd.read_parquet(parquet_path), parquet_path
+
+    # Read GBK encoded source file
+    return pd.read_csv(input_path, encoding='gbk'), input_path
 
 
 def convert_edge_to_adjacency(year, input_path):
     """
     Convert edge table data to weighted adjacency matrix for a specific year
 
+    The edge list script already writes the matrix next to the edge table; if
+    that file is at least as new as the edge table it is reused as-is.
+
     Parameters:
         year: year (for output filename)
         input_path: full path to input CSV file
@@ -14,9 +33,26 @@ def convert_edge_to_adjacency(year, input_path):
     try:
         print(f"Processing {year} data...")
 
-        # Read GBK encoded source file
-        df = pd.read_csv(input_path, encoding='gbk')
-        print(f"Successfully read {year} GBK encoded source file")
+        # Generate output path
+        output_dir = os.path.dirname(input_path)
+        output_file_name = f"Trade_Weighted_Adjacency_Matrix_{year}.csv"
+        output_file_path = os.path.join(output_dir, output_file_name)
+        output_parquet_path = os.path.splitext(output_file_path)[0] + '.parquet'
+
+        # Reuse the pre-built matrix if the edge table has not changed since
+        if os.path.exists(output_file_path) and os.path.getmtime(output_file_path) >= os.path.getmtime(input_path):
+            country_count = len(pd.read_csv(output_file_path, usecols=[0], encoding='utf-8'))
+            print(f"Pre-built adjacency matrix is up to date: {output_file_path}")
+            return {
+                'year': year,
+                'success': True,
+                'output_path': output_file_path,
+                'matrix_shape': (country_count, country_count),
+                'num_countries': country_count
+            }
+
+        df, source_path = read_edge_table(input_path)
+        print(f"Successfully read {year} source file: {os.path.basename(source_path)}")
 
         # Extract core columns
         required_cols = ['source', 'target', 'weight']
@@ -33,8 +69,8 @@ def convert_edge_to_adjacency(year, input_path):
         df_core = df[actual_cols].copy()
         df_core.columns = required_cols  # Standardize to lowercase
 
-        # Ensure weight column is numeric
-        df_core['weight'] = pd.to_numeric(df_core['weight'], errors='coerce').fillna(0)
+        # Ensure weight column is numeric (Wij is rounded to 4 decimals, float32 is enough)
+        df_core['weight'] = pd.to_numeric(df_core['weight'], errors='coerce', downcast='float').fillna(0)
 
         # Get all unique countries
         all_countries = sorted(list(set(df_core['source'].unique()) | set(df_core['target'].unique())))
@@ -45,35 +81,26 @@ def convert_edge_to_adjacency(year, input_path):
         country_to_idx = {country: idx for idx, country in enumerate(all_countries)}
 
         # Create empty weighted adjacency matrix
-        adj_matrix = np.zeros((country_count, country_count), dtype=float)
-
-        # Fill matrix
-        processed_rows = 0
-        for _, row in df_core.iterrows():
-            export_country = row['source']
-            import_country = row['target']
-            weight = row['weight']
+        adj_matrix = np.zeros((country_count, country_count), dtype=np.float32)
 
-            if export_country in country_to_idx and import_country in country_to_idx:
-                export_idx = country_to_idx[export_country]
-                import_idx = country_to_idx[import_country]
-                adj_matrix[export_idx, import_idx] = weight
-                processed_rows += 1
+        # Fill matrix (rows: exporters, columns: importers)
+        export_idx = df_core['source'].map(country_to_idx).to_numpy(dtype=float)
+        import_idx = df_core['target'].map(country_to_idx).to_numpy(dtype=float)
+        weights = df_core['weight'].to_numpy()
+        valid = ~(np.isnan(export_idx) | np.isnan(import_idx))
+        adj_matrix[export_idx[valid].astype(int), import_idx[valid].astype(int)] = weights[valid]
+        processed_rows = int(valid.sum())
 
         print(f"Processed {processed_rows} trade relationships")
 
-        # Generate output path
-        output_dir = os.path.dirname(input_path)
-        output_file_name = f"Trade_Weighted_Adjacency_Matrix_{year}.csv"
-        output_file_path = os.path.join(output_dir, output_file_name)
-
-        # Save matrix as CSV
+        # Save matrix as CSV (for Ucinet) and Parquet (for the structural hole step)
         adj_matrix_df = pd.DataFrame(
             adj_matrix,
             index=all_countries,
             columns=all_countries
         )
         adj_matrix_df.to_csv(output_file_path, encoding='utf-8', index=True)
+        adj_matrix_df.to_parquet(output_parquet_path, compression='zstd', index=True)
         print(f"Adjacency matrix saved to: {output_file_path}")
         print(f"Matrix dimensions: {country_count} rows × {country_count} columns")
 
@@ -112,26 +139,33 @@ def main():
     print()
 
     # Store all processing results
-    results = []
-
-    # Process years in order
-    for year in sorted(year_files.keys()):
-        input_path = year_files[year]
+    results_by_year = {}
+    pending = {}
+
+    # Process years in parallel, one worker process per year
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for year in sorted(year_files.keys()):
+            input_path = year_files[year]
+
+            # Check if file exists
+            if not os.path.exists(input_path):
+                print(f"Warning: {year} file does not exist, skipping: {input_path}")
+                results_by_year[year] = {
+                    'year': year,
+                    'success': False,
+                    'error': 'File not found'
+                }
+                continue
+
+            # Process data for this year
+            pending[year] = executor.submit(convert_edge_to_adjacency, year, input_path)
+
+        for year, future in pending.items():
+            results_by_year[year] = future.result()
+    print()
 
-        # Check if file exists
-        if not os.path.exists(input_path):
-            print(f"Warning: {year} file does not exist, skipping: {input_path}")
-            results.append({
-                'year': year,
-                'success': False,
-                'error': 'File not found'
-            })
-            continue
-
-        # Process data for this year
-        result = convert_edge_to_adjacency(year, input_path)
-        results.append(result)
-        print()
+    # Keep results in year order for the summary
+    results = [results_by_year[year] for year in sorted(results_by_year)]
 
     print("=" * 60)
     print("Processing complete! Summary report:")
@@ -1,171 +1,126 @@
 ﻿import pandas as pd
 import numpy as np
-import networkx as nx
 import os
+from concurrent.futures import ProcessPoolExecutor
 
 
-def calculate_structural_holes(adj_matrix_path, direction='both'):
+def load_adjacency_matrix(adj_matrix_path):
+    """
+    Load an adjacency matrix, preferring the Parquet copy written next to the CSV
+
+    The Parquet file is only used when it is at least as new as the CSV.
+    Weights are stored as float32 and upcast so the indicators are computed in float64.
+    """
+    parquet_path = os.path.splitext(adj_matrix_path)[0] + '.parquet'
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(adj_matrix_path):
+        return pd.read_parquet(parquet_path).astype(float)
+    return pd.read_csv(adj_matrix_path, index_col=0, encoding='utf-8')
+
+
+def calculate_structural_holes(df_matrix, directions=('outgoing', 'incoming', 'both')):
     """
     Calculate structural hole indicators for trade network
 
+    The matrix is read once by the caller and shared by all directions.
+
     Parameters:
-        adj_matrix_path: Path to adjacency matrix CSV file
-        direction: Relationship direction, options: 'outgoing', 'incoming', 'both'
+        df_matrix: Weighted adjacency matrix DataFrame (rows: exporters, columns: importers)
+        directions: Relationship directions to calculate, options: 'outgoing', 'incoming', 'both'
 
     Returns:
-        DataFrame containing structural hole indicators
+        Dict mapping each direction to a DataFrame containing structural hole indicators
     """
-    print(f"Calculating structural hole indicators, direction: {direction}")
-
-    # Read adjacency matrix
-    df_matrix = pd.read_csv(adj_matrix_path, index_col=0, encoding='utf-8')
     countries = df_matrix.index.tolist()
-    n = len(countries)
-
-    print(f"Loaded adjacency matrix with {n} countries")
-
-    # Adjust matrix based on direction
-    if direction == 'outgoing':
-        matrix = df_matrix.values.copy()
-    elif direction == 'incoming':
-        matrix = df_matrix.T.values.copy()
-    elif direction == 'both':
-        matrix = (df_matrix.values + df_matrix.T.values) / 2
-        np.fill_diagonal(matrix, 0)
-
-    # Convert to NetworkX graph object
-    G = nx.DiGraph() if direction != 'both' else nx.Graph()
-    G.add_nodes_from(countries)
-
-    # Add weighted edges
-    edge_count = 0
-    for i in range(n):
-        for j in range(n):
-            if i != j and matrix[i, j] > 0:
-                G.add_edge(countries[i], countries[j], weight=matrix[i, j])
-                edge_count += 1
+    values = df_matrix.to_numpy(dtype=float)
+
+    print(f"Loaded adjacency matrix with {len(countries)} countries")
+
+    # Neighbor pairs tied in either direction are the same for every direction
+    positive = values > 0
+    np.fill_diagonal(positive, False)
+    tied = (positive | positive.T).astype(float)
+
+    results = {}
+    for direction in directions:
+        print(f"Calculating structural hole indicators, direction: {direction}")
+
+        # Adjust matrix based on direction
+        if direction == 'outgoing':
+            matrix = values
+        elif direction == 'incoming':
+            matrix = values.T
+        elif direction == 'both':
+            matrix = (values + values.T) / 2
+
+        results[direction] = structural_hole_indicators(countries, matrix, tied)
+
+    return results
+
+
+def structural_hole_indicators(countries, matrix, tied):
+    """
+    Calculate structural hole indicators from a direction-adjusted weight matrix
+
+    Parameters:
+        countries: Country names in matrix order
+        matrix: Weight matrix (rows: ego, columns: alters)
+        tied: 1.0 where two countries are linked in either direction, else 0.0
+
+    Returns:
+        DataFrame containing structural hole indicators
+    """
+    # Weighted edges: positive off-diagonal entries
+    W = np.where(matrix > 0, matrix, 0.0)
+    np.fill_diagonal(W, 0)
+    linked = W > 0
+    edge_count = int(linked.sum())
 
     print(f"Built network graph with {edge_count} edges")
 
     # Check for isolated nodes
-    isolated_nodes = [node for node in countries if G.degree(node) == 0]
-    if isolated_nodes:
-        print(f"Found {len(isolated_nodes)} isolated nodes")
-
-    # Calculate structural hole indicators
-    results = []
-
-    for node in countries:
-        neighbors = list(G.neighbors(node))
-
-        if len(neighbors) == 0:
-            results.append({
-                'Country': node,
-                'Degree': 0,
-                'EffectiveSize': np.nan,
-                'Efficiency': np.nan,
-                'Constraint': np.nan,
-                'Hierarchy': np.nan
-            })
-            continue
-
-        total_weight = sum([G[node][j]['weight'] for j in neighbors])
-
-        if total_weight == 0:
-            results.append({
-                'Country': node,
-                'Degree': len(neighbors),
-                'EffectiveSize': 0,
-                'Efficiency': 0,
-                'Constraint': np.nan,
-                'Hierarchy': np.nan
-            })
-            continue
-
-        # Calculate p_ij matrix
-        p_ij = {}
-        for j in neighbors:
-            p_ij[j] = G[node][j]['weight'] / total_weight
-
-        # Calculate constraint
-        constraint = 0
-        for j in neighbors:
-            direct = p_ij[j]
-
-            indirect = 0
-            for q in neighbors:
-                if q != j:
-                    if G.has_edge(q, j):
-                        neighbors_q = list(G.neighbors(q))
-                        total_weight_q = sum([G[q][k]['weight'] for k in neighbors_q])
-                        if total_weight_q > 0:
-                            p_qj = G[q][j]['weight'] / total_weight_q
-                        else:
-                            p_qj = 0
-                    else:
-                        p_qj = 0
-
-                    indirect += p_ij[q] * p_qj
-
-            constraint += (direct + indirect) ** 2
-
-        # Calculate effective size
-        effective_size = 0
-        for j in neighbors:
-            redundancy = 0
-            for q in neighbors:
-                if q != j:
-                    if G.has_edge(j, q) or G.has_edge(q, j):
-                        redundancy += 1
-
-            if len(neighbors) > 0:
-                effective_size += 1 - (redundancy / len(neighbors))
+    isolated_count = int((~(linked.any(axis=1) | linked.any(axis=0))).sum())
+    if isolated_count:
+        print(f"Found {isolated_count} isolated nodes")
 
-        # Calculate efficiency
-        efficiency = effective_size / len(neighbors) if len(neighbors) > 0 else 0
+    degree = linked.sum(axis=1)
+    total_weight = W.sum(axis=1, keepdims=True)
 
-        # Calculate hierarchy
-        hierarchy = 0
-        valid_pairs = 0
-
-        for j in neighbors:
-            direct = p_ij[j]
-            indirect = 0
-            for q in neighbors:
-                if q != j:
-                    if G.has_edge(q, j):
-                        neighbors_q = list(G.neighbors(q))
-                        total_weight_q = sum([G[q][k]['weight'] for k in neighbors_q])
-                        if total_weight_q > 0:
-                            p_qj = G[q][j]['weight'] / total_weight_q
-                        else:
-                            p_qj = 0
-                        indirect += p_ij[q] * p_qj
-
-            c_ij = (direct + indirect) ** 2
-
-            if constraint > 0 and c_ij > 0:
-                ratio = c_ij / constraint
-                if ratio > 0:
-                    hierarchy += ratio * np.log(ratio)
-                    valid_pairs += 1
-
-        if valid_pairs > 1 and constraint > 0 and hierarchy < 0:
-            n_valid = valid_pairs
-            hierarchy = -hierarchy / (n_valid * np.log(n_valid))
-        else:
-            hierarchy = np.nan
+    # Calculate p_ij matrix
+    P = np.divide(W, total_weight, out=np.zeros_like(W), where=total_weight > 0)
 
-        results.append({
-            'Country': node,
-            'Degree': len(neighbors),
-            'EffectiveSize': round(effective_size, 4),
-            'Efficiency': round(efficiency, 4),
-            'Constraint': round(constraint, 4) if not np.isnan(constraint) else np.nan,
-            'Hierarchy': round(hierarchy, 4) if not np.isnan(hierarchy) else np.nan
-        })
+    # Calculate constraint: c_ij = (p_ij + sum_q p_iq * p_qj)^2 over neighbors j
+    c_ij = np.where(linked, (P + P @ P) ** 2, 0.0)
+    constraint = c_ij.sum(axis=1)
 
-    results_df = pd.DataFrame(results)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Calculate effective size: redundancy counts neighbor pairs tied in either direction
+        linked_float = linked.astype(float)
+        redundancy = ((linked_float @ tied) * linked_float).sum(axis=1)
+        effective_size = degree - redundancy / degree
+
+        # Calculate efficiency
+        efficiency = effective_size / degree
+
+        # Calculate hierarchy
+        ratio = c_ij / constraint[:, None]
+        valid_pair = linked & (ratio > 0)
+        hierarchy_sum = np.where(valid_pair, ratio * np.log(ratio), 0.0).sum(axis=1)
+        valid_pairs = valid_pair.sum(axis=1)
+        hierarchy = np.where(
+            (valid_pairs > 1) & (constraint > 0) & (hierarchy_sum < 0),
+            -hierarchy_sum / (valid_pairs * np.log(valid_pairs)),
+            np.nan
+        )
+
+    isolated = degree == 0
+    results_df = pd.DataFrame({
+        'Country': countries,
+        'Degree': degree,
+        'EffectiveSize': np.where(isolated, np.nan, np.round(effective_size, 4)),
+        'Efficiency': np.where(isolated, np.nan, np.round(efficiency, 4)),
+        'Constraint': np.where(isolated, np.nan, np.round(constraint, 4)),
+        'Hierarchy': np.where(isolated, np.nan, np.round(hierarchy, 4))
+    })
 
     results_df_for_sort = results_df.copy()
     results_df_for_sort['Constraint'] = results_df_for_sort['Constraint'].fillna(999)
@@ -181,10 +136,92 @@ def calculate_structural_holes(adj_matrix_path, direction='both'):
     return results_df
 
 
+def analyze_year(base_dir, year):
+    """
+    Calculate and save structural holes for all directions of one year
+
+    Parameters:
+        base_dir: Base directory, e.g., "your_file_location"
+        year: Year to analyze
+
+    Returns:
+        List of summary row dicts, one per direction with valid results
+    """
+    try:
+        adj_matrix_file = os.path.join(base_dir, str(year),
+                                       f"Trade_Weighted_Adjacency_Matrix_{year}.csv")
+        results_by_direction = calculate_structural_holes(load_adjacency_matrix(adj_matrix_file))
+
+    except Exception as e:
+        print(f"Processing {year} failed: {str(e)}")
+        import traceback
+        print(f"Error details: {traceback.format_exc()}")
+        return []
+
+    summary_rows = []
+    for direction, results_df in results_by_direction.items():
+        summary_row = save_year_direction(base_dir, year, direction, results_df)
+        if summary_row is not None:
+            summary_rows.append(summary_row)
+    return summary_rows
+
+
+def save_year_direction(base_dir, year, direction, results_df):
+    """
+    Save structural holes for one year and direction
+
+    Parameters:
+        base_dir: Base directory, e.g., "your_file_location"
+        year: Year analyzed
+        direction: Relationship direction, options: 'outgoing', 'incoming', 'both'
+        results_df: Structural hole indicators for this direction
+
+    Returns:
+        Summary row dict, or None if there are no valid results
+    """
+    try:
+        output_file = os.path.join(base_dir, str(year),
+                                   f"Structural_Holes_{direction}_{year}.csv")
+        results_df.to_csv(output_file, encoding='utf-8', index=False)
+
+        print(f"Results saved to: {output_file}")
+
+        valid_results = results_df[results_df['Constraint'].notna()]
+        if len(valid_results) == 0:
+            print(f"No valid structural hole calculation results")
+            return None
+
+        top_countries = valid_results.head(10)
+        print(f"\n{year} {direction.capitalize()} - Top 10 countries with rich structural holes:")
+        print("-" * 80)
+        print(
+            top_countries[['Country', 'Constraint', 'EffectiveSize', 'Efficiency']].to_string(index=False))
+
+        return {
+            'Year': year,
+            'Direction': direction,
+            'Top_Country': top_countries.iloc[0]['Country'],
+            'Min_Constraint': top_countries.iloc[0]['Constraint'],
+            'Avg_Constraint': valid_results['Constraint'].mean(),
+            'Num_Countries': len(results_df),
+            'Num_Valid': len(valid_results),
+            'File_Path': output_file
+        }
+
+    except Exception as e:
+        print(f"Processing {year} {direction} failed: {str(e)}")
+        import traceback
+        print(f"Error details: {traceback.format_exc()}")
+        return None
+
+
 def batch_structural_holes_analysis(base_dir, start_year=2013, end_year=2023):
     """
     Batch analyze structural holes for multiple years
 
+    Each year is an independent job run in a worker process; its adjacency
+    matrix is loaded once and shared by all three directions.
+
     Parameters:
         base_dir: Base directory, e.g., "your_file_location"
         start_year: Start year
@@ -195,55 +232,22 @@ def batch_structural_holes_analysis(base_dir, start_year=2013, end_year=2023):
     print("=" * 60)
 
     summary_data = []
+    futures = []
 
-    for year in range(start_year, end_year + 1):
-        print(f"\nProcessing {year} data...")
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for year in range(start_year, end_year + 1):
+            adj_matrix_file = os.path.join(base_dir, str(year),
+                                           f"Trade_Weighted_Adjacency_Matrix_{year}.csv")
 
-        adj_matrix_file = os.path.join(base_dir, str(year),
-                                       f"Trade_Weighted_Adjacency_Matrix_{year}.csv")
+            if not os.path.exists(adj_matrix_file):
+                print(f"File does not exist: {adj_matrix_file}")
+                print(f"Please ensure the edge-to-adjacency matrix conversion has been run")
+                continue
+
+            futures.append(executor.submit(analyze_year, base_dir, year))
 
-        if not os.path.exists(adj_matrix_file):
-            print(f"File does not exist: {adj_matrix_file}")
-            print(f"Please ensure the edge-to-adjacency matrix conversion has been run")
-            continue
-
-        try:
-            for direction in ['outgoing', 'incoming', 'both']:
-                print(f"Calculating direction: {direction}")
-
-                results_df = calculate_structural_holes(adj_matrix_file, direction=direction)
-
-                output_file = os.path.join(base_dir, str(year),
-                                           f"Structural_Holes_{direction}_{year}.csv")
-                results_df.to_csv(output_file, encoding='utf-8', index=False)
-
-                print(f"Results saved to: {output_file}")
-
-                valid_results = results_df[results_df['Constraint'].notna()]
-                if len(valid_results) > 0:
-                    top_countries = valid_results.head(10)
-                    print(f"\n{direction.capitalize()} - Top 10 countries with rich structural holes:")
-                    print("-" * 80)
-                    print(
-                        top_countries[['Country', 'Constraint', 'EffectiveSize', 'Efficiency']].to_string(index=False))
-
-                    summary_data.append({
-                        'Year': year,
-                        'Direction': direction,
-                        'Top_Country': top_countries.iloc[0]['Country'],
-                        'Min_Constraint': top_countries.iloc[0]['Constraint'],
-                        'Avg_Constraint': valid_results['Constraint'].mean(),
-                        'Num_Countries': len(results_df),
-                        'Num_Valid': len(valid_results),
-                        'File_Path': output_file
-                    })
-                else:
-                    print(f"No valid structural hole calculation results")
-
-        except Exception as e:
-            print(f"Processing failed: {str(e)}")
-            import traceback
-            print(f"Error details: {traceback.format_exc()}")
+        for future in futures:
+            summary_data.extend(future.result())
 
     if summary_data:
         summary_df = pd.DataFrame(summary_data)
@@ -277,7 +281,8 @@ def analyze_single_year(year, base_dir="your_file_location", direction='both'):
         print(f"File does not exist: {adj_matrix_file}")
         return None
 
-    results_df = calculate_structural_holes(adj_matrix_file, direction=direction)
+    results_df = calculate_structural_holes(load_adjacency_matrix(adj_matrix_file),
+                                            directions=(direction,))[direction]
 
     output_file = os.path.join(base_dir, str(year),
                                f"Structural_Holes_{direction}_{year}.csv")
@@ -1,6 +1,8 @@
 ﻿import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 import os
-from collections import Counter
 
 # Define file paths
 file_paths = {
@@ -17,53 +19,59 @@ file_paths = {
     2023: "your_file_location/2023/Structural_Holes_both_2023.csv"
 }
 
+# Standardize column names
+col_mapping = {
+    'country': 'Country',
+    'Nation': 'Country',
+    'nation': 'Country',
+    'Effective Size': 'EffectiveSize',
+    'effective_size': 'EffectiveSize',
+    'constraint': 'Constraint'
+}
+required_columns = ['Country', 'EffectiveSize', 'Constraint']
+
 # Initialize storage
-effective_frequency = Counter()
-constraint_frequency = Counter()
+all_years_df = pd.DataFrame(columns=required_columns + ['Year'])
 all_years_data = {}
 
-# Read all years data and count frequencies
-for year, file_path in file_paths.items():
-    try:
-        # Multi-encoding reading
-        for encoding in ['utf-8', 'gbk', 'ISO-8859-1']:
-            try:
-                df = pd.read_csv(file_path, encoding=encoding)
-                break
-            except:
-                continue
-
-        # Standardize column names
-        col_mapping = {
-            'country': 'Country',
-            'Nation': 'Country',
-            'nation': 'Country',
-            'Effective Size': 'EffectiveSize',
-            'effective_size': 'EffectiveSize',
-            'constraint': 'Constraint'
-        }
-        df.rename(columns=col_mapping, inplace=True)
-
-        # Check required columns
-        if not all(col in df.columns for col in ['Country', 'EffectiveSize', 'Constraint']):
-            continue
-
-        all_years_data[year] = df
-
-        # Count EffectiveSize top 20 frequency (descending)
-        effective_top20 = df.sort_values('EffectiveSize', ascending=False).head(20)['Country'].str.strip()
-        effective_frequency.update(effective_top20)
-
-        # Count Constraint top 20 frequency (ascending, smaller is better)
-        constraint_top20 = df.sort_values('Constraint').head(20)['Country'].str.strip()
-        constraint_frequency.update(constraint_top20)
-
-    except Exception:
-        continue
+# Read all years in one dataset scan, tagging each file with its year
+existing_paths = {year: path for year, path in file_paths.items() if os.path.exists(path)}
+if existing_paths:
+    csv_format = ds.CsvFileFormat()
+    file_columns = ds.dataset(next(iter(existing_paths.values())), format=csv_format).schema.names
+    source_columns = {col_mapping.get(col, col): col for col in file_columns}
+
+    # Check required columns
+    if all(col in source_columns for col in required_columns):
+        schema = pa.schema([
+            (source_columns['Country'], pa.string()),
+            (source_columns['EffectiveSize'], pa.float64()),
+            (source_columns['Constraint'], pa.float64()),
+            ('Year', pa.int64())
+        ])
+        dataset = ds.FileSystemDataset.from_paths(
+            list(existing_paths.values()),
+            schema=schema,
+            format=csv_format,
+            filesystem=pafs.LocalFileSystem(),
+            partitions=[ds.field('Year') == year for year in existing_paths]
+        )
+        all_years_df = dataset.to_table().to_pandas().rename(columns=col_mapping)
+        all_years_df['Country'] = all_years_df['Country'].str.strip()
+        all_years_data = {year: df for year, df in all_years_df.groupby('Year')}
+
+
+def top_n_by_frequency(df, metric, ascending, n=10):
+    """Countries most often in a year's top 20 for metric; ties keep first-seen order"""
+    yearly_top20 = df.sort_values(['Year', metric], ascending=[True, ascending]).groupby('Year').head(20)
+    frequency = yearly_top20['Country'].value_counts(sort=False).sort_values(ascending=False, kind='stable')
+    return frequency.head(n).index.tolist()
+
 
 # Get top 10 most frequent countries
-top10_effective = [c for c, _ in effective_frequency.most_common(10)]
-top10_constraint = [c for c, _ in constraint_frequency.most_common(10)]
+# EffectiveSize top 20 (descending); Constraint top 20 (ascending, smaller is better)
+top10_effective = top_n_by_frequency(all_years_df, 'EffectiveSize', ascending=False)
+top10_constraint = top_n_by_frequency(all_years_df, 'Constraint', ascending=True)
 
 
 def calculate_proportion(yearly_data, top_countries, metric):
@@ -2,9 +2,11 @@
 import re
 import pandas as pd
 import numpy as np
-from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 
+from centrality_ranking import save_ranking_results
+
 warnings.filterwarnings('ignore')
 
 # Configuration parameters
@@ -23,10 +25,13 @@ file_paths = [
 ]
 
 save_dir = "your_file_location"
-os.makedirs(save_dir, exist_ok=True)
 output_dir = os.path.join(save_dir, "degree_centrality_analysis_results")
-os.makedirs(output_dir, exist_ok=True)
 years = ['2013', '2014', '2015', '2016', '2017', '2018', '2019', '2020', '2021', '2022', '2023']
+WRITE_XLSX = False  # Also write Excel copies of the CSV results
+
+# UCINET row pattern and the lines that end the data section
+_UCINET_PAT = re.compile(r'^\s*(\d+)\s+([A-Za-z\s\.\-\'\(\)\/,\?ĂĽĂ´Ă¤Ăˇ]+?)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)')
+_TERMS = ('DESCRIPTIVE STATISTICS', 'Network Centralization', 'Running time:')
 
 
 def parse_ucinet_file(file_path):
@@ -35,158 +40,75 @@ def parse_ucinet_file(file_path):
     indegree_data = {}
 
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.read().split('\n')
-
+        # Collect the data section: after the header, up to the first terminator line
+        data_lines = []
         in_data_section = False
-        pattern = r'^\s*(\d+)\s+([A-Za-z\s\.\-\'\(\)\/,\?ĂĽĂ´Ă¤Ăˇ]+?)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)\s+([\d\.]+)'
-
-        for line in lines:
-            if not line.strip():
-                continue
-
-            if 'OutDegree' in line and 'InDegree' in line and 'NrmOutDeg' in line and 'NrmInDeg' in line:
-                in_data_section = True
-                continue
-
-            if any(key in line for key in ['DESCRIPTIVE STATISTICS', 'Network Centralization', 'Running time:']):
-                break
-
-            if in_data_section:
-                match = re.match(pattern, line)
-                if match:
-                    country_name = match.group(2).strip()
-                    outdegree_data[country_name] = float(match.group(5))
-                    indegree_data[country_name] = float(match.group(6))
-                else:
-                    parts = line.split()
-                    if len(parts) >= 6:
-                        try:
-                            country_name = ' '.join(parts[:-4]).strip()
-                            outdegree_data[country_name] = float(parts[-2])
-                            indegree_data[country_name] = float(parts[-1])
-                        except (ValueError, IndexError):
-                            continue
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                line = line.rstrip('\n')
+                if 'OutDegree' in line and 'InDegree' in line and 'NrmOutDeg' in line and 'NrmInDeg' in line:
+                    in_data_section = True
+                    continue
+
+                if any(key in line for key in _TERMS):
+                    break
+
+                if in_data_section and line.strip():
+                    data_lines.append(line)
+
+        block = pd.Series(data_lines, dtype=object)
+
+        # Match all rows at once; rows the pattern misses fall back to whitespace splitting
+        rows = block.str.extract(_UCINET_PAT)[[1, 4, 5]]
+        rows.columns = ['country', 'NrmOutDeg', 'NrmInDeg']
+        rows['country'] = rows['country'].str.strip()
+        unmatched = rows['country'].isna()
+        if unmatched.any():
+            rows.loc[unmatched] = [split_degree_row(line) for line in block[unmatched]]
+        rows = rows.dropna(subset=['country'])
+
+        outdegree_data = dict(zip(rows['country'], rows['NrmOutDeg'].astype(float).tolist()))
+        indegree_data = dict(zip(rows['country'], rows['NrmInDeg'].astype(float).tolist()))
     except Exception:
         pass
 
     return outdegree_data, indegree_data
 
 
-def get_yearly_top_n(data_dict, n=20):
-    """Get top N for each year"""
-    yearly_top_n = {}
-    yearly_values = {}
-    yearly_rankings = {}
-
-    for year in years:
-        if year in data_dict and data_dict[year]:
-            sorted_data = sorted(data_dict[year].items(), key=lambda x: x[1], reverse=True)
-            top_n_data = sorted_data[:n]
-
-            yearly_top_n[year] = [c for c, v in top_n_data]
-            yearly_values[year] = {c: v for c, v in top_n_data}
-            yearly_rankings[year] = {c: i + 1 for i, (c, v) in enumerate(sorted_data)}
-        else:
-            yearly_top_n[year] = []
-            yearly_values[year] = {}
-            yearly_rankings[year] = {}
-
-    return yearly_top_n, yearly_values, yearly_rankings
-
-
-def get_overall_top_n_by_frequency(yearly_top_n, n=20):
-    """Get overall top N by frequency"""
-    all_countries = []
-    for countries in yearly_top_n.values():
-        all_countries.extend(countries)
-    frequency = Counter(all_countries)
-    sorted_freq = sorted(frequency.items(), key=lambda x: (-x[1], x[0]))
-    return [c for c, f in sorted_freq[:n]], frequency
-
-
-def save_analysis_results(data_dict, metric_name, save_dir):
-    """Save analysis results"""
-    yearly_top20, yearly_values, yearly_rankings = get_yearly_top_n(data_dict)
-    overall_top20, frequency = get_overall_top_n_by_frequency(yearly_top20)
-
-    df_data = {c: [data_dict[y].get(c, np.nan) for y in years] for c in overall_top20}
-    complete_df = pd.DataFrame(df_data, index=years)
-
-    yearly_top20_df = pd.DataFrame(index=range(1, 21))
-    for year in years:
-        if year in yearly_values:
-            top20 = list(yearly_values[year].keys())[:20]
-            formatted = [f"{c} ({v:.3f})" for c, v in yearly_values[year].items()]
-            formatted += [""] * (20 - len(formatted))
-            yearly_top20_df[year] = formatted
-        else:
-            yearly_top20_df[year] = [""] * 20
-
-    all_countries = sorted(set(c for yr in yearly_rankings for c in yearly_rankings[yr].keys()))
-    detailed_df = pd.DataFrame(index=all_countries, columns=years)
-    for c in all_countries:
-        for y in years:
-            detailed_df.loc[c, y] = yearly_rankings[y].get(c, "")
-
-    overall_df = pd.DataFrame({
-        'Rank': range(1, len(overall_top20) + 1),
-        'Country': overall_top20,
-        'Count': [frequency[c] for c in overall_top20],
-        'Frequency': [f"{frequency[c]}/11" for c in overall_top20]
-    })
-
-    avg_values = {}
-    for c in overall_top20:
-        values = [complete_df.loc[y, c] for y in years if
-                  c in complete_df.columns and not pd.isna(complete_df.loc[y, c])]
-        avg_values[c] = np.mean(values) if values else 0
-    sorted_avg = sorted(avg_values.items(), key=lambda x: -x[1])
-    avg_df = pd.DataFrame({
-        'Rank': range(1, len(sorted_avg) + 1),
-        'Country': [c for c, v in sorted_avg],
-        'Average': [v for c, v in sorted_avg],
-        'Count': [frequency[c] for c, v in sorted_avg]
-    })
-
-    os.makedirs(save_dir, exist_ok=True)
-
-    yearly_top20_df.to_csv(os.path.join(save_dir, f"{metric_name}_yearly_top20.csv"), encoding='utf-8-sig')
-    detailed_df.to_csv(os.path.join(save_dir, f"{metric_name}_detailed_rankings.csv"), encoding='utf-8-sig')
-    overall_df.to_csv(os.path.join(save_dir, f"{metric_name}_overall_top20_by_frequency.csv"), encoding='utf-8-sig', index=False)
-    avg_df.to_csv(os.path.join(save_dir, f"{metric_name}_overall_top20_by_average.csv"), encoding='utf-8-sig', index=False)
-    complete_df.to_csv(os.path.join(save_dir, f"{metric_name}_complete_data.csv"), encoding='utf-8-sig')
-
-    with pd.ExcelWriter(os.path.join(save_dir, f"{metric_name}_yearly_top20.xlsx"), engine='openpyxl') as writer:
-        yearly_top20_df.to_excel(writer, sheet_name='Yearly_Top20')
-
-    with pd.ExcelWriter(os.path.join(save_dir, f"{metric_name}_complete_data.xlsx"), engine='openpyxl') as writer:
-        complete_df.to_excel(writer, sheet_name='Complete_Data')
-        overall_df.to_excel(writer, sheet_name='Overall_Rank_Frequency', index=False)
-        avg_df.to_excel(writer, sheet_name='Overall_Rank_Average', index=False)
-
-    return overall_top20, frequency
+def split_degree_row(line):
+    """Fallback for rows the pattern misses: country name followed by four values"""
+    parts = line.split()
+    if len(parts) >= 6:
+        try:
+            return ' '.join(parts[:-4]).strip(), float(parts[-2]), float(parts[-1])
+        except ValueError:
+            pass
+    return np.nan, np.nan, np.nan
 
 
 def main():
     all_outdegree = {}
     all_indegree = {}
 
-    for i, file_path in enumerate(file_paths):
-        year = years[i]
-        if os.path.exists(file_path):
-            out_data, in_data = parse_ucinet_file(file_path)
-            all_outdegree[year] = out_data
-            all_indegree[year] = in_data
-        else:
-            all_outdegree[year] = {}
-            all_indegree[year] = {}
+    # Parse yearly files in parallel, one worker process per file
+    with ProcessPoolExecutor(max_workers=min(len(file_paths), os.cpu_count())) as executor:
+        futures = {}
+        for i, file_path in enumerate(file_paths):
+            year = years[i]
+            if os.path.exists(file_path):
+                futures[year] = executor.submit(parse_ucinet_file, file_path)
+            else:
+                all_outdegree[year] = {}
+                all_indegree[year] = {}
+
+        for year, future in futures.items():
+            all_outdegree[year], all_indegree[year] = future.result()
 
     out_dir = os.path.join(output_dir, "outdegree_analysis")
-    out_top20, out_freq = save_analysis_results(all_outdegree, "OutDegree", out_dir)
+    out_top20, out_freq = save_ranking_results(all_outdegree, years, "OutDegree", out_dir, write_xlsx=WRITE_XLSX)
 
     in_dir = os.path.join(output_dir, "indegree_analysis")
-    in_top20, in_freq = save_analysis_results(all_indegree, "InDegree", in_dir)
+    in_top20, in_freq = save_ranking_results(all_indegree, years, "InDegree", in_dir, write_xlsx=WRITE_XLSX)
 
     with open(os.path.join(output_dir, "analysis_summary.txt"), 'w', encoding='utf-8') as f:
         f.write("Degree Centrality Analysis Summary\n")
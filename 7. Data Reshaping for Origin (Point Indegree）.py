@@ -55,15 +55,12 @@ try:
     # Convert to long format and sort by country-year
     print("\nConverting to long format and sorting...")
 
-    long_df = pd.melt(
-        df,
-        id_vars=[year_column],
-        value_vars=countries,
-        var_name='Country',
-        value_name='Indegree_Centrality_Value'
-    )
-
-    long_df = long_df.rename(columns={year_column: 'Year'})
+    # Flatten the year x country table row by row; missing values stay as NaN rows
+    long_df = pd.DataFrame({
+        'Year': np.repeat(df[year_column].to_numpy(), len(countries)),
+        'Country': np.tile(np.array(countries, dtype=object), len(df)),
+        'Indegree_Centrality_Value': df[countries].to_numpy().ravel()
+    })
     long_df = long_df.sort_values(['Country', 'Year']).reset_index(drop=True)
 
     print(f"Conversion complete! Long format data shape: {long_df.shape}")
@@ -82,7 +79,7 @@ try:
 
     print(f"\nSaving Excel file: {output_file_excel}")
 
-    with pd.ExcelWriter(output_file_excel, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_file_excel, engine='xlsxwriter') as writer:
         long_df.to_excel(writer, sheet_name='All_Data', index=False)
 
         origin_df = long_df.copy()
@@ -91,21 +88,11 @@ try:
         origin_df.to_excel(writer, sheet_name='Origin_Format', index=False)
 
         print("Calculating yearly Top20 rankings...")
-        all_years_rank = []
+        ranked = long_df.sort_values(['Year', 'Indegree_Centrality_Value'], ascending=[True, False])
+        ranked['Rank'] = ranked.groupby('Year', sort=False).cumcount() + 1
 
-        for year in sorted(long_df['Year'].unique()):
-            year_data = long_df[long_df['Year'] == year]
-            year_rank = year_data.sort_values('Indegree_Centrality_Value', ascending=False)
-            year_rank = year_rank.reset_index(drop=True)
-            year_rank['Rank'] = year_rank.index + 1
-
-            year_rank_top20 = year_rank.head(20)
-            year_rank_top20.insert(0, 'Year', year)
-            all_years_rank.append(year_rank_top20)
-
-        if all_years_rank:
-            all_rank_df = pd.concat(all_years_rank, ignore_index=True)
-            all_rank_df = all_rank_df[['Year', 'Rank', 'Country', 'Indegree_Centrality_Value']]
+        if len(ranked):
+            all_rank_df = ranked[ranked['Rank'] <= 20][['Year', 'Rank', 'Country', 'Indegree_Centrality_Value']]
             all_rank_df.to_excel(writer, sheet_name='Yearly_Top20_Rankings', index=False)
 
     print(f"Excel file saved!")
@@ -134,11 +121,10 @@ try:
     print(f"\nYearly indegree centrality champion:")
 
     champion_by_year = {}
-    for year in sorted(long_df['Year'].unique()):
-        year_data = long_df[long_df['Year'] == year]
-        champion = year_data.loc[year_data['Indegree_Centrality_Value'].idxmax()]
-        champion_by_year[year] = (champion['Country'], champion['Indegree_Centrality_Value'])
-        print(f"  {year}: {champion['Country']} ({champion['Indegree_Centrality_Value']:.3f})")
+    champions = long_df.loc[long_df.groupby('Year')['Indegree_Centrality_Value'].idxmax()]
+    for year, country, value in zip(champions['Year'], champions['Country'], champions['Indegree_Centrality_Value']):
+        champion_by_year[year] = (country, value)
+        print(f"  {year}: {country} ({value:.3f})")
 
     print(f"\nChampion frequency statistics:")
     champion_counts = {}
@@ -153,10 +139,11 @@ try:
     print(f"\nGenerating worksheet with separate sheets per country...")
     output_file_by_country = os.path.join(output_dir, "indegree_by_country_separate_sheets.xlsx")
 
-    with pd.ExcelWriter(output_file_by_country, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_file_by_country, engine='xlsxwriter') as writer:
+        # long_df is already sorted by country-year, so each group is in year order
+        country_groups = dict(list(long_df.groupby('Country', sort=False)))
         for country in countries[:15]:
-            country_data = long_df[long_df['Country'] == country].copy()
-            country_data = country_data.sort_values('Year')
+            country_data = country_groups[country]
 
             sheet_name = country[:10] if len(country) > 10 else country
             country_data.to_excel(writer, sheet_name=sheet_name, index=False)
@@ -63,17 +63,12 @@ try:
     # Convert to long format and sort by country-year
     print("\nConverting to long format and sorting...")
 
-    # Use melt to convert
-    long_df = pd.melt(
-        df,
-        id_vars=[year_column],
-        value_vars=countries,
-        var_name='Country',
-        value_name='Betweenness_Centrality_Value'
-    )
-
-    # Rename year column
-    long_df = long_df.rename(columns={year_column: 'Year'})
+    # Flatten the year x country table row by row; missing values stay as NaN rows
+    long_df = pd.DataFrame({
+        'Year': np.repeat(df[year_column].to_numpy(), len(countries)),
+        'Country': np.tile(np.array(countries, dtype=object), len(df)),
+        'Betweenness_Centrality_Value': df[countries].to_numpy().ravel()
+    })
 
     # Sort by country then year
     long_df = long_df.sort_values(['Country', 'Year']).reset_index(drop=True)
@@ -94,7 +89,7 @@ try:
 
     print(f"\nSaving Excel file: {output_file_excel}")
 
-    with pd.ExcelWriter(output_file_excel, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_file_excel, engine='xlsxwriter') as writer:
         # Save complete data
         long_df.to_excel(writer, sheet_name='All_Data', index=False)
 
@@ -107,26 +102,13 @@ try:
         # Calculate yearly Top20 rankings
         print("Calculating yearly Top20 rankings...")
 
-        all_years_rank = []
+        # Sort each year by value descending and number rows within the year
+        ranked = long_df.sort_values(['Year', 'Betweenness_Centrality_Value'], ascending=[True, False])
+        ranked['Rank'] = ranked.groupby('Year', sort=False).cumcount() + 1
 
-        for year in sorted(long_df['Year'].unique()):
-            year_data = long_df[long_df['Year'] == year]
-            # Sort by value descending
-            year_rank = year_data.sort_values('Betweenness_Centrality_Value', ascending=False)
-            year_rank = year_rank.reset_index(drop=True)
-            year_rank['Rank'] = year_rank.index + 1
-
-            # Take top 20
-            year_rank_top20 = year_rank.head(20)
-
-            # Add year column for identification
-            year_rank_top20.insert(0, 'Year', year)
-            all_years_rank.append(year_rank_top20)
-
-        # Combine all years' rankings
-        if all_years_rank:
-            all_rank_df = pd.concat(all_years_rank, ignore_index=True)
-            all_rank_df = all_rank_df[['Year', 'Rank', 'Country', 'Betweenness_Centrality_Value']]
+        # Take top 20 of every year
+        if len(ranked):
+            all_rank_df = ranked[ranked['Rank'] <= 20][['Year', 'Rank', 'Country', 'Betweenness_Centrality_Value']]
             all_rank_df.to_excel(writer, sheet_name='Yearly_Top20_Rankings', index=False)
 
     print(f"Excel file saved!")
@@ -158,11 +140,10 @@ try:
     print(f"\nYearly betweenness centrality champion:")
 
     champion_by_year = {}
-    for year in sorted(long_df['Year'].unique()):
-        year_data = long_df[long_df['Year'] == year]
-        champion = year_data.loc[year_data['Betweenness_Centrality_Value'].idxmax()]
-        champion_by_year[year] = (champion['Country'], champion['Betweenness_Centrality_Value'])
-        print(f"  {year}: {champion['Country']} ({champion['Betweenness_Centrality_Value']:.6f})")
+    champions = long_df.loc[long_df.groupby('Year')['Betweenness_Centrality_Value'].idxmax()]
+    for year, country, value in zip(champions['Year'], champions['Country'], champions['Betweenness_Centrality_Value']):
+        champion_by_year[year] = (country, value)
+        print(f"  {year}: {country} ({value:.6f})")
 
     # Most consistent Top5 countries
     print(f"\nChampion frequency statistics:")
@@ -179,11 +160,12 @@ try:
     print(f"\nGenerating worksheet with separate sheets per country...")
     output_file_by_country = os.path.join(output_dir, "betweenness_by_country_separate_sheets.xlsx")
 
-    with pd.ExcelWriter(output_file_by_country, engine='openpyxl') as writer:
+    with pd.ExcelWriter(output_file_by_country, engine='xlsxwriter') as writer:
         # Group by country, each country gets its own sheet
+        # long_df is already sorted by country-year, so each group is in year order
+        country_groups = dict(list(long_df.groupby('Country', sort=False)))
         for country in countries[:15]:  # Only process first 15 countries to avoid file being too large
-            country_data = long_df[long_df['Country'] == country].copy()
-            country_data = country_data.sort_values('Year')
+            country_data = country_groups[country]
 
             # Sheet name limited to 31 characters, take first 10 characters
             sheet_name = country[:10] if len(country) > 10 else country
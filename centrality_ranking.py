@@ -0,0 +1,121 @@
+﻿"""Ranking and result tables shared by the degree and betweenness centrality scripts"""
+import csv
+import heapq
+import pandas as pd
+import numpy as np
+from collections import Counter
+from pathlib import Path
+
+
+def get_yearly_top_n(data_dict, years, n=20):
+    """Get top N for each year"""
+    yearly_top_n = {}
+    yearly_values = {}
+    yearly_rankings = {}
+
+    for year in years:
+        if year in data_dict and data_dict[year]:
+            countries = np.array(list(data_dict[year].keys()), dtype=object)
+            values = np.fromiter(data_dict[year].values(), dtype=np.float64, count=len(data_dict[year]))
+            # Stable descending sort, ties keep file order
+            order = np.argsort(-values, kind='stable')
+            sorted_countries = countries[order].tolist()
+            sorted_values = values[order].tolist()
+
+            yearly_top_n[year] = sorted_countries[:n]
+            yearly_values[year] = dict(zip(sorted_countries[:n], sorted_values[:n]))
+            yearly_rankings[year] = dict(zip(sorted_countries, range(1, len(sorted_countries) + 1)))
+        else:
+            yearly_top_n[year] = []
+            yearly_values[year] = {}
+            yearly_rankings[year] = {}
+
+    return yearly_top_n, yearly_values, yearly_rankings
+
+
+def get_overall_top_n_by_frequency(yearly_top_n, n=20):
+    """Get overall top N by frequency"""
+    all_countries = []
+    for countries in yearly_top_n.values():
+        all_countries.extend(countries)
+    frequency = Counter(all_countries)
+    # Highest count first, ties by country name; only the top n are kept
+    top_freq = heapq.nsmallest(n, frequency.items(), key=lambda x: (-x[1], x[0]))
+    return [c for c, f in top_freq], frequency
+
+
+def save_ranking_results(data_dict, years, metric_name, save_dir, value_format='.3f', write_xlsx=False):
+    """
+    Rank a metric per year and save the yearly, detailed and overall result tables
+
+    Parameters:
+        data_dict: {year: {country: value}}
+        years: Years to include, in output order
+        metric_name: Prefix for the output file names
+        save_dir: Output directory
+        value_format: Format spec for values in the yearly top 20 table
+        write_xlsx: Also write Excel copies of the tables
+
+    Returns:
+        Overall top 20 countries by frequency and the frequency Counter
+    """
+    yearly_top20, yearly_values, yearly_rankings = get_yearly_top_n(data_dict, years)
+    overall_top20, frequency = get_overall_top_n_by_frequency(yearly_top20)
+
+    df_data = {c: [data_dict[y].get(c, np.nan) for y in years] for c in overall_top20}
+    complete_df = pd.DataFrame(df_data, index=years)
+
+    yearly_top20_df = pd.DataFrame(index=range(1, 21))
+    for year in years:
+        if year in yearly_values:
+            formatted = [f"{c} ({v:{value_format}})" for c, v in yearly_values[year].items()]
+            formatted += [""] * (20 - len(formatted))
+            yearly_top20_df[year] = formatted
+        else:
+            yearly_top20_df[year] = [""] * 20
+
+    all_countries = sorted(set(c for yr in yearly_rankings for c in yearly_rankings[yr].keys()))
+
+    overall_df = pd.DataFrame({
+        'Rank': range(1, len(overall_top20) + 1),
+        'Country': overall_top20,
+        'Count': [frequency[c] for c in overall_top20],
+        'Frequency': [f"{frequency[c]}/11" for c in overall_top20]
+    })
+
+    avg_series = complete_df[overall_top20].mean().fillna(0).sort_values(ascending=False, kind='stable')
+    avg_df = pd.DataFrame({
+        'Rank': range(1, len(avg_series) + 1),
+        'Country': avg_series.index,
+        'Average': avg_series.values,
+        'Count': [frequency[c] for c in avg_series.index]
+    })
+
+    base = Path(save_dir)
+    base.mkdir(parents=True, exist_ok=True)
+
+    yearly_top20_df.to_csv(base / f"{metric_name}_yearly_top20.csv",
+                           encoding='utf-8-sig', lineterminator='\n')
+    # Country x year ranks, written row by row; blank where a country has no rank that year
+    with open(base / f"{metric_name}_detailed_rankings.csv", 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow([''] + years)
+        for c in all_countries:
+            writer.writerow([c] + [yearly_rankings[y].get(c, "") for y in years])
+    overall_df.to_csv(base / f"{metric_name}_overall_top20_by_frequency.csv",
+                      encoding='utf-8-sig', lineterminator='\n', index=False)
+    avg_df.to_csv(base / f"{metric_name}_overall_top20_by_average.csv",
+                  encoding='utf-8-sig', lineterminator='\n', index=False)
+    complete_df.to_csv(base / f"{metric_name}_complete_data.csv",
+                       encoding='utf-8-sig', lineterminator='\n')
+
+    if write_xlsx:
+        with pd.ExcelWriter(base / f"{metric_name}_yearly_top20.xlsx", engine='xlsxwriter') as writer:
+            yearly_top20_df.to_excel(writer, sheet_name='Yearly_Top20')
+
+        with pd.ExcelWriter(base / f"{metric_name}_complete_data.xlsx", engine='xlsxwriter') as writer:
+            complete_df.to_excel(writer, sheet_name='Complete_Data')
+            overall_df.to_excel(writer, sheet_name='Overall_Rank_Frequency', index=False)
+            avg_df.to_excel(writer, sheet_name='Overall_Rank_Average', index=False)
+
+    return overall_top20, frequency